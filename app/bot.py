@@ -2,7 +2,9 @@
 
 import asyncio
 import logging
+import logging.handlers
 import os
+import queue
 import tempfile
 import traceback
 
@@ -32,6 +34,7 @@ from app.handlers.menu import (
     clean_tmp,
 )
 from app.handlers.ingest import handle_download_message
+from app.handlers.telegram_utils import flow_locked
 from app.handlers.search import (
     handle_page,
     handle_tmdb_select,
@@ -42,7 +45,7 @@ from app.handlers.search import (
     handle_cancel_flow,
     build_results_keyboard,
 )
-from app.services.tmdb import search as tmdb_search, tmdb_last_error
+from app.services.tmdb import search as tmdb_search, to_refs
 from app.state import (
     STATE_SEARCH,
     STATE_MANUAL_TITLE,
@@ -52,6 +55,17 @@ from app.state import (
 )
 
 
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+LOG_MAX_BYTES = 10_000_000
+LOG_BACKUP_COUNT = 3
+
+
+def _file_log_handler(path: str) -> logging.Handler:
+    return logging.handlers.RotatingFileHandler(
+        path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT, encoding="utf-8"
+    )
+
+
 def _build_log_handlers():
     stream = logging.StreamHandler()
     handlers = [stream]
@@ -60,82 +74,132 @@ def _build_log_handlers():
         log_dir = os.path.dirname(log_path)
         if log_dir:
             os.makedirs(log_dir, exist_ok=True)
-        handlers.insert(0, logging.FileHandler(log_path, encoding="utf-8"))
+        handlers.insert(0, _file_log_handler(log_path))
     except Exception as e:
         fallback_dir = os.path.join(tempfile.gettempdir(), "plexbot")
         fallback_path = os.path.join(fallback_dir, "bot.log")
         try:
             os.makedirs(fallback_dir, exist_ok=True)
-            handlers.insert(0, logging.FileHandler(fallback_path, encoding="utf-8"))
+            handlers.insert(0, _file_log_handler(fallback_path))
             print(f"Falling back to {fallback_path}: {e}")
         except Exception as e2:
             print(f"Console-only logging; cannot open log files: {e2}")
     return handlers
 
 
-async def _text_router(update, context):
-    text = update.message.text.strip()
-    state = context.user_data.get("state")
-
-    if state == STATE_SEARCH:
-        results = await asyncio.to_thread(tmdb_search, text)
-        context.user_data["tmdb_results"] = results
-        context.user_data["tmdb_page"] = 0
-        context.user_data.pop("state", None)
-        if results:
-            first = results[0]
-            markup = build_results_keyboard(results, 0)
-            if first.poster:
-                await update.message.reply_photo(
-                    photo=first.poster,
-                    caption="Results:",
-                    reply_markup=markup,
-                )
-            else:
-                await update.message.reply_text(
-                    "Results:", reply_markup=markup
-                )
+def _start_log_listener() -> logging.handlers.QueueListener:
+    """Route records through a queue so file/console writes happen off the event loop."""
+    handlers = _build_log_handlers()
+    formatter = logging.Formatter(LOG_FORMAT)
+    for handler in handlers:
+        handler.setFormatter(formatter)
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers)
+    listener.start()
+
+    root = logging.getLogger()
+    root.setLevel(logging.INFO)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    return listener
+
+
+async def _handle_text_search(update, context, text: str) -> None:
+    ud = context.user_data
+    results, err = await asyncio.to_thread(tmdb_search, text)
+    ud["tmdb_results"] = to_refs(results)
+    ud["tmdb_page"] = 0
+    ud.pop("state", None)
+    if results:
+        first = results[0]
+        markup = build_results_keyboard(results, 0)
+        if first.poster:
+            await update.message.reply_photo(
+                photo=first.poster,
+                caption="Results:",
+                reply_markup=markup,
+            )
         else:
-            err = tmdb_last_error()
-            note = f" TMDb: {err}" if err else ""
-            await update.message.reply_text(f"No results.{note}")
-        return
+            await update.message.reply_text(
+                "Results:", reply_markup=markup
+            )
+    else:
+        note = f" TMDb: {err}" if err else ""
+        await update.message.reply_text(f"No results.{note}")
 
-    if state == STATE_MANUAL_TITLE:
-        context.user_data["pending_title"] = text
-        context.user_data.pop("state", None)
-        from app.handlers.search import build_library_keyboard
 
-        await update.message.reply_text(
-            f"Title: {text}\n\nSelect destination library:",
-            reply_markup=build_library_keyboard(),
-        )
+async def _handle_text_manual_title(update, context, text: str) -> None:
+    ud = context.user_data
+    ud["pending_title"] = text
+    ud.pop("state", None)
+    from app.handlers.search import build_library_keyboard
+
+    await update.message.reply_text(
+        f"Title: {text}\n\nSelect destination library:",
+        reply_markup=build_library_keyboard(),
+    )
+
+
+async def _handle_text_manual_season(update, context, text: str) -> None:
+    ud = context.user_data
+    try:
+        season = int(text)
+    except ValueError:
+        await update.message.reply_text("Enter a valid season number.")
         return
+    ud["pending_season"] = season
+    ud.pop("state", None)
+    from app.handlers.search import build_library_keyboard
+
+    title = ud.get("pending_title") or "Content"
+    await update.message.reply_text(
+        f"{title} — Season {season}\n\nSelect destination library:",
+        reply_markup=build_library_keyboard(),
+    )
 
-    if state == STATE_MANUAL_SEASON:
-        try:
-            season = int(text)
-        except ValueError:
-            await update.message.reply_text("Enter a valid season number.")
-            return
-        context.user_data["pending_season"] = season
-        context.user_data.pop("state", None)
-        from app.handlers.search import build_library_keyboard
-
-        title = context.user_data.get("pending_title") or "Content"
-        await update.message.reply_text(
-            f"{title} — Season {season}\n\nSelect destination library:",
-            reply_markup=build_library_keyboard(),
-        )
+
+_TEXT_HANDLERS = {
+    STATE_SEARCH: _handle_text_search,
+    STATE_MANUAL_TITLE: _handle_text_manual_title,
+    STATE_MANUAL_SEASON: _handle_text_manual_season,
+}
+
+
+@flow_locked
+async def _text_router(update, context):
+    text = update.message.text.strip()
+    handler = _TEXT_HANDLERS.get(context.user_data.get("state"))
+    if handler is not None:
+        await handler(update, context, text)
         return
 
     # No state — treat as potential link or search
     if "https://t.me" in text:
         await handle_download_message(update, context)
-        return
 
-    # Default: ignore or suggest search
-    return
+
+# Callback data is "prefix|value..."; one dict lookup replaces a regex per handler.
+_CALLBACK_ROUTES = {
+    "action": handle_action,
+    "tmdb": handle_tmdb_select,
+    "season": handle_season,
+    "lib": handle_library,
+    "page": handle_page,
+    "cancel": handle_cancel_flow,
+    "manual": handle_manual_entry,
+    "cancel_task": queue_cancel,
+    "autolib": handle_autolib,
+}
+
+
+@flow_locked
+async def _route_callback(update: Update, context: ContextTypes.DEFAULT_TYPE) -> None:
+    data = update.callback_query.data or ""
+    prefix, sep, _ = data.partition("|")
+    handler = _CALLBACK_ROUTES.get(prefix) if sep else None
+    if handler is None:
+        logging.debug("Ignoring unrouted callback data: %s", data)
+        return
+    await handler(update, context)
 
 
 def _is_authorized_update(update: Update, st) -> bool:
@@ -183,11 +247,7 @@ def main():
     if not st.allowed_chat_ids and not st.admin_user_ids:
         raise SystemExit("Missing ALLOWED_CHAT_IDS or ADMIN_USER_IDS; refusing to run open to all chats")
 
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s [%(levelname)s] %(message)s",
-        handlers=_build_log_handlers(),
-    )
+    log_listener = _start_log_listener()
     for noisy in (
         "httpx", "httpcore", "telegram.request", "telegram.bot",
         "telegram.ext._application",
@@ -232,34 +292,29 @@ def main():
 
     # Commands
     app.add_handler(CommandHandler("start", start))
-    app.add_handler(CommandHandler("search", search_cmd))
-    app.add_handler(CommandHandler("cancel", cancel_cmd))
-    app.add_handler(CommandHandler("cancel_all", cancel_all_cmd))
+    app.add_handler(CommandHandler("search", flow_locked(search_cmd)))
+    app.add_handler(CommandHandler("cancel", flow_locked(cancel_cmd)))
+    app.add_handler(CommandHandler("cancel_all", flow_locked(cancel_all_cmd)))
     app.add_handler(CommandHandler("menu", menu_cmd))
     app.add_handler(CommandHandler("queue", queue_cmd))
     app.add_handler(CommandHandler("clean_tmp", clean_tmp))
 
-    # Callback handlers — order matters (most specific first)
-    app.add_handler(CallbackQueryHandler(handle_action, pattern=r"^action\|"))
-    app.add_handler(CallbackQueryHandler(handle_tmdb_select, pattern=r"^tmdb\|"))
-    app.add_handler(CallbackQueryHandler(handle_season, pattern=r"^season\|"))
-    app.add_handler(CallbackQueryHandler(handle_library, pattern=r"^lib\|"))
-    app.add_handler(CallbackQueryHandler(handle_page, pattern=r"^page\|"))
-    app.add_handler(CallbackQueryHandler(handle_cancel_flow, pattern=r"^cancel\|"))
-    app.add_handler(CallbackQueryHandler(handle_manual_entry, pattern=r"^manual\|start"))
-    app.add_handler(CallbackQueryHandler(queue_cancel, pattern=r"^cancel_task\|"))
-    app.add_handler(CallbackQueryHandler(handle_autolib, pattern=r"^autolib\|"))
+    # Callback queries — one handler, routed by the prefix before "|"
+    app.add_handler(CallbackQueryHandler(_route_callback))
 
     # Message handlers
     app.add_handler(
         MessageHandler(filters.TEXT & ~filters.COMMAND, _text_router)
     )
     app.add_handler(
-        MessageHandler(~filters.TEXT & ~filters.COMMAND, handle_download_message)
+        MessageHandler(~filters.TEXT & ~filters.COMMAND, flow_locked(handle_download_message))
     )
 
     print("PlexBot ready. Forward links/files or use /search.")
-    app.run_polling()
+    try:
+        app.run_polling()
+    finally:
+        log_listener.stop()
 
 
 if __name__ == "__main__":
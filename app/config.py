@@ -5,20 +5,47 @@ import yaml
 from dataclasses import dataclass, field
 from typing import Optional
 
+# libyaml-backed loader when PyYAML was built with it; same safe semantics.
+_YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+
+# Parsed .env contents per path, keyed on file mtime.
+_env_cache: dict[str, tuple[float, dict[str, str]]] = {}
+
+
+def _read_env_file(path: str) -> dict[str, str]:
+    values: dict[str, str] = {}
+    with open(path, "rb") as f:
+        raw = f.read()
+    for line in raw.splitlines():
+        # Blank, comment and malformed lines are dropped before any decoding.
+        line = line.strip()
+        if not line or line[0] == 0x23 or b"=" not in line:  # 0x23 == "#"
+            continue
+        key, _, val = line.decode("utf-8").partition("=")
+        key = key.strip()
+        val = val.strip().strip('"').strip("'")
+        if key:
+            values.setdefault(key, val)
+    return values
+
 
 def load_env_file(path: str = ".env") -> None:
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        return
     if not os.path.isfile(path):
         return
-    with open(path, "r", encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line or line.startswith("#") or "=" not in line:
-                continue
-            key, _, val = line.partition("=")
-            key = key.strip()
-            val = val.strip().strip('"').strip("'")
-            if key and key not in os.environ:
-                os.environ[key] = val
+    cached = _env_cache.get(path)
+    if cached is not None and cached[0] == mtime:
+        values = cached[1]
+    else:
+        values = _read_env_file(path)
+        _env_cache[path] = (mtime, values)
+    for key, val in values.items():
+        if key not in os.environ:
+            os.environ[key] = val
 
 
 def _parse_id_set(value: Optional[str]) -> set[str]:
@@ -63,9 +90,28 @@ class Settings:
     telegram_token: Optional[str] = None
 
 
+# Parsed settings per YAML path, keyed on file mtime so edits are picked up.
+_settings_cache: dict[str, tuple[float, Settings]] = {}
+
+
 def load_settings(yaml_path: str = "config/libraries.yaml") -> Settings:
+    """Return settings for yaml_path, re-parsing only when the file changes."""
+    try:
+        mtime = os.path.getmtime(yaml_path)
+    except OSError:
+        mtime = None
+    cached = _settings_cache.get(yaml_path)
+    if cached is not None and mtime is not None and cached[0] == mtime:
+        return cached[1]
+    settings = _read_settings(yaml_path)
+    if mtime is not None:
+        _settings_cache[yaml_path] = (mtime, settings)
+    return settings
+
+
+def _read_settings(yaml_path: str) -> Settings:
     with open(yaml_path, "r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
+        data = yaml.load(f, Loader=_YamlLoader) or {}
 
     libs = [
         Library(
@@ -8,6 +8,7 @@ import logging
 import os
 import shlex
 import time
+from collections import deque
 from dataclasses import dataclass
 from pathlib import Path
 from typing import Callable, Awaitable, Optional
@@ -15,6 +16,7 @@ from typing import Callable, Awaitable, Optional
 from app.services.downloader import run_download as _run_tdl
 from app.services.namer import safe_title
 from app.services.extractor import extract_archives
+from app.services.walk import iter_files
 from app.state import SERIES_TYPES, MOVIE_TYPES, record_recent, title_with_year
 from app.config import load_settings
 from telegram.error import RetryAfter, TimedOut
@@ -38,7 +40,7 @@ def _build_tdl_args(template: str, link: str, download_dir: str, use_group: bool
 
 # ── DownloadManager ─────────────────────────────────────────────
 
-@dataclass
+@dataclass(slots=True)
 class TaskItem:
     id: int
     chat_id: int
@@ -72,7 +74,7 @@ class DownloadManager:
 
     def __init__(self, max_concurrent: int = 1):
         self.max_concurrent = max_concurrent
-        self.queue: list[TaskItem] = []
+        self.queue: deque[TaskItem] = deque()
         self._id_gen = itertools.count(1)
         self.child_pids: dict[int, list[int]] = {}
         self._lock = asyncio.Lock()
@@ -91,7 +93,7 @@ class DownloadManager:
                     self._current = None
                     self._worker = None
                     return
-                item = self.queue.pop(0)
+                item = self.queue.popleft()
                 self._current = item
                 logging.info("Starting task %s (chat %s). Queued: %s", item.id, item.chat_id, len(self.queue))
             try:
@@ -130,9 +132,10 @@ class DownloadManager:
             coro_factory=coro_factory,
         )
         self.queue.append(item)
-        logging.info("Enqueued task %s (chat %s). Queue length: %s", task_id, chat_id, len(self.queue))
+        pos = len(self.queue)
+        logging.info("Enqueued task %s (chat %s). Queue length: %s", task_id, chat_id, pos)
         asyncio.create_task(self._ensure_worker())
-        return self.queue.index(item) + 1, task_id
+        return pos, task_id
 
     async def cancel_running(self, chat_id: int) -> int:
         cancelled = 0
@@ -166,7 +169,7 @@ class DownloadManager:
     async def cancel_all(self, chat_id: int) -> tuple[int, int]:
         running = await self.cancel_running(chat_id)
         before = len(self.queue)
-        self.queue = [item for item in self.queue if item.chat_id != chat_id]
+        self.queue = deque(item for item in self.queue if item.chat_id != chat_id)
         await self._ensure_worker()
         return running, before - len(self.queue)
 
@@ -186,10 +189,10 @@ class DownloadManager:
         if self._current and self._current.chat_id == chat_id and self._current.content_id == target:
             running = await self.cancel_running(chat_id)
         before = len(self.queue)
-        self.queue = [
+        self.queue = deque(
             item for item in self.queue
             if not (item.chat_id == chat_id and item.content_id == target)
-        ]
+        )
         if running or before != len(self.queue):
             await self._ensure_worker()
         return running, before - len(self.queue)
@@ -297,6 +300,14 @@ def _snapshot_files(path: str) -> set[str]:
     return snap
 
 
+def _remove_files(path: str, rel_paths: set[str]) -> None:
+    for rel in sorted(rel_paths):
+        try:
+            os.remove(os.path.join(path, rel))
+        except Exception:
+            pass
+
+
 def _apply_permissions(path: str, puid: int, pgid: int, dir_mode: int, file_mode: int) -> None:
     try:
         os.chown(path, puid, pgid)
@@ -334,27 +345,25 @@ def _process_directory(
     if not root.exists():
         logging.warning("_process_directory: path does not exist: %s", directory)
         return
-    files_before = [str(p) for p in root.rglob("*") if p.is_file()]
+    files_before = sum(1 for _ in iter_files(directory))
     logging.info(
         "_process_directory: dir=%s title=%s season=%s lib_type=%s year=%s files=%s",
-        directory, title, season_hint, lib_type, year, len(files_before),
+        directory, title, season_hint, lib_type, year, files_before,
     )
     extract_archives(root)
     if lib_type in SERIES_TYPES:
         logging.info("_process_directory: calling bulk_rename (series) for %s", directory)
-        bulk_rename(root, title, season_hint)
+        renamed = bulk_rename(root, title, season_hint)
     elif lib_type in MOVIE_TYPES:
         logging.info("_process_directory: calling rename_movie_files (movie) for %s", directory)
-        rename_movie_files(root, title, year)
+        renamed = rename_movie_files(root, title, year)
     elif lib_type is None:
         logging.warning("_process_directory: lib_type is None, inferring from season_hint (season=%s). Treating as series.", season_hint)
-        bulk_rename(root, title, season_hint)
+        renamed = bulk_rename(root, title, season_hint)
     else:
         logging.warning("_process_directory: unknown lib_type=%s, treating as series", lib_type)
-        bulk_rename(root, title, season_hint)
-    files_after = [str(p) for p in root.rglob("*") if p.is_file()]
-    renamed = set(files_after) - set(files_before)
-    logging.info("_process_directory: done. files_before=%d files_after=%d renamed=%d", len(files_before), len(files_after), len(renamed))
+        renamed = bulk_rename(root, title, season_hint)
+    logging.info("_process_directory: done. files_before=%d renamed=%d", files_before, renamed)
 
 
 def _should_reset_after_enqueue(context, lib_type: str) -> bool:
@@ -496,7 +505,7 @@ async def queue_download(
                 status_msg = await _safe_send(f"▶️ Starting: {human_label}")
         status_holder["msg"] = status_msg
 
-        before_files = _snapshot_files(path_clean)
+        before_files = await asyncio.to_thread(_snapshot_files, path_clean)
         last_progress = {"pct": -1, "ts": 0.0}
 
         async def report_progress(pct: int, _line: str):
@@ -550,15 +559,11 @@ async def queue_download(
                 logging.error("Download execution failed for %s: %s", human_label, e)
                 ok = False
 
-        after_files = _snapshot_files(path_clean)
+        after_files = await asyncio.to_thread(_snapshot_files, path_clean)
         new_files = after_files - before_files
 
         if not ok:
-            for rel in sorted(new_files):
-                try:
-                    os.remove(os.path.join(path_clean, rel))
-                except (FileNotFoundError, Exception):
-                    pass
+            await asyncio.to_thread(_remove_files, path_clean, new_files)
             logging.error("Download failed; skipped post-processing for %s", path_clean)
             pending_same = await mgr.pending_for_content(message.chat_id, path_clean)
             if pending_same == 0:
@@ -11,12 +11,14 @@ from dataclasses import dataclass
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
-from app.services.tmdb import search as tmdb_search, tmdb_last_error
+from app.services.tmdb import search as tmdb_search, to_refs
 from app.handlers.search import build_results_keyboard
 from app.handlers.download import queue_download
 from app.services.telegram_download import _get_file_info, _is_private_chat, _is_too_large
 from app.state import (
+    SERIES_TYPES,
     STATE_SEARCH,
+    SelectedTitle,
     set_state,
     get_recent_for,
 )
@@ -80,6 +82,20 @@ _RX_RES_TOKEN = re.compile(r"^(?:2160p|1080p|720p|576p|480p|360p|800p|4k)$", re.
 # Framerate token: 24fps, etc.
 _RX_FPS_TOKEN = re.compile(r"^\d+fps$", re.I)
 
+# Separators normalized to a single space before tokenization
+_RX_SEPARATORS = re.compile(r"[._\-+&\s]+")
+
+# Extensions stripped from the stem (os.path.splitext treats 5.1, 7.1 as
+# extensions — too greedy)
+_STRIP_EXTS = (".mkv", ".mp4", ".avi", ".mov", ".ts", ".m4v", ".webm",
+               ".flv", ".wmv", ".mpg", ".mpeg", ".m2ts", ".mts",
+               ".rar", ".zip", ".7z", ".tar", ".gz")
+
+# Single-letter / short tokens kept in titles (articles, prepositions)
+_KEEP_SHORT = {"a", "e", "y", "o", "u", "el", "la", "lo", "le",
+               "de", "del", "al", "en", "un", "una", "the", "of",
+               "in", "on", "at", "to", "is", "an", "as", "by", "or"}
+
 # ── Patterns that indicate the string is *only* an episode/season marker ──
 
 _RX_ONLY_EPISODE_MARKER = re.compile(
@@ -109,13 +125,10 @@ def _parse_filename(filename: str) -> ParsedName:
     subtitle/noise and excluded from the title.
     """
     # Strip known video/archive extensions only
-    # (os.path.splitext treats 5.1, 7.1 as extensions — too greedy)
-    _VIDEO_EXTS = (".mkv", ".mp4", ".avi", ".mov", ".ts", ".m4v", ".webm",
-                   ".flv", ".wmv", ".mpg", ".mpeg", ".m2ts", ".mts",
-                   ".rar", ".zip", ".7z", ".tar", ".gz")
     stem = filename
-    for ext in _VIDEO_EXTS:
-        if stem.lower().endswith(ext):
+    stem_lower = stem.lower()
+    for ext in _STRIP_EXTS:
+        if stem_lower.endswith(ext):
             stem = stem[: -len(ext)]
             break
 
@@ -139,9 +152,7 @@ def _parse_filename(filename: str) -> ParsedName:
     stem = _RX_PAREN_CONTENT.sub(" ", stem)
 
     # ── Normalize all separators to spaces ───────────────────────────
-    cleaned = stem.replace(".", " ").replace("_", " ").replace("-", " ")
-    cleaned = cleaned.replace("+", " ").replace("&", " ")
-    cleaned = re.sub(r"\s+", " ", cleaned).strip()
+    cleaned = _RX_SEPARATORS.sub(" ", stem).strip()
 
     tokens = cleaned.split()
 
@@ -226,9 +237,6 @@ def _parse_filename(filename: str) -> ParsedName:
         # Skip single-character tokens that are likely noise (s, c, etc.)
         # but keep single-letter articles/prepositions common in titles
         # and single-digit franchise numbers (2 in "Greenland 2")
-        _KEEP_SHORT = {"a", "e", "y", "o", "u", "el", "la", "lo", "le",
-                       "de", "del", "al", "en", "un", "una", "the", "of",
-                       "in", "on", "at", "to", "is", "an", "as", "by", "or"}
         if len(tok) == 1 and tok.lower() not in _KEEP_SHORT and not tok.isupper() and not tok.isdigit():
             continue
 
@@ -254,7 +262,6 @@ def _parse_filename(filename: str) -> ParsedName:
         title_tokens.pop()
 
     title = " ".join(title_tokens).strip()
-    title = re.sub(r"\s+", " ", title)
 
     # ── Fallback: if title is too short, try including post-SE tokens ─
     if not title or len(title) < 2:
@@ -478,7 +485,7 @@ async def handle_download_message(update: Update, context: ContextTypes.DEFAULT_
         lib_type = active_lib.get("type", "movie")
 
         # For movies: auto-queue and clear destination (each movie is independent)
-        if lib_type not in ("series", "anime"):
+        if lib_type not in SERIES_TYPES:
             from app.handlers.download import queue_download
 
             display_name = filename or link
@@ -582,12 +589,12 @@ async def handle_download_message(update: Update, context: ContextTypes.DEFAULT_
             context.user_data["pending_year"] = recent.get("year") or context.user_data.get("pending_year")
             recent_lib = recent.get("library") or {}
             recent_type = recent_lib.get("type", "movie")
-            context.user_data["selected_tmdb"] = {
-                "id": 0,
-                "kind": "tv" if recent_type in ("series", "anime") else "movie",
-                "title": recent["title"],
-                "year": context.user_data.get("pending_year"),
-            }
+            context.user_data["selected_tmdb"] = SelectedTitle(
+                id=0,
+                kind="tv" if recent_type in SERIES_TYPES else "movie",
+                title=recent["title"],
+                year=context.user_data.get("pending_year"),
+            )
             lib_kb = build_library_keyboard()
             rows = lib_kb.inline_keyboard + [
                 [InlineKeyboardButton("✍️ Search another title", callback_data="action|search")]
@@ -602,8 +609,8 @@ async def handle_download_message(update: Update, context: ContextTypes.DEFAULT_
             )
         else:
             # Auto-search TMDb with the CLEANED title (no SxxExx, no year)
-            results = await asyncio.to_thread(tmdb_search, guess)
-            context.user_data["tmdb_results"] = results
+            results, err = await asyncio.to_thread(tmdb_search, guess)
+            context.user_data["tmdb_results"] = to_refs(results)
             context.user_data["tmdb_page"] = 0
 
             if results:
@@ -627,7 +634,6 @@ async def handle_download_message(update: Update, context: ContextTypes.DEFAULT_
                 else:
                     await _safe_reply(message, caption_text, reply_markup=markup)
             else:
-                err = tmdb_last_error() or ""
                 note = f"\nTMDb: {err}" if err else ""
                 context.user_data["state"] = STATE_SEARCH
                 await _safe_reply(
@@ -11,7 +11,7 @@ from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
 from app.config import load_settings
-from app.state import reset_flow_state, title_with_year, title_without_year
+from app.state import SERIES_TYPES, reset_flow_state, title_with_year, title_without_year
 from app.handlers.telegram_utils import (
     delete_safely,
     edit_message_safely,
@@ -231,7 +231,7 @@ async def show_recent(update: Update, context: ContextTypes.DEFAULT_TYPE):
         dest = f" · {lib_name}" if lib_name else ""
         lines.append(f"{i + 1}. {e.get('title', '?')}{detail}{dest}")
         lib_type = (e.get("library") or {}).get("type", "")
-        if lib_type in ("series", "anime") or season is not None:
+        if lib_type in SERIES_TYPES or season is not None:
             buttons.append([
                 InlineKeyboardButton(
                     f"📥 {e.get('title', '?')}{detail}",
@@ -377,7 +377,7 @@ async def handle_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
         context.chat_data["pending_links"] = []
         active_lib = context.chat_data.get("active_library") or {}
-        if active_lib.get("type") not in {"series", "anime"}:
+        if active_lib.get("type") not in SERIES_TYPES:
             context.chat_data.pop("download_dir", None)
             context.chat_data.pop("active_library", None)
             context.chat_data.pop("season_hint", None)
@@ -417,11 +417,11 @@ async def handle_action(update: Update, context: ContextTypes.DEFAULT_TYPE):
             guess = _guess_title(fname)
 
         if guess and _is_meaningful(guess):
-            from app.services.tmdb import search as tmdb_search, tmdb_last_error
+            from app.services.tmdb import search as tmdb_search, to_refs
             from app.handlers.search import build_results_keyboard
 
-            results = await asyncio.to_thread(tmdb_search, guess)
-            context.user_data["tmdb_results"] = results
+            results, _ = await asyncio.to_thread(tmdb_search, guess)
+            context.user_data["tmdb_results"] = to_refs(results)
             context.user_data["tmdb_page"] = 0
             context.user_data["state"] = "pending_selection"
 
@@ -1,25 +1,29 @@
 """TMDb search flow: result selection, pagination, season pick, library choice."""
 
 import asyncio
+from functools import lru_cache
+from typing import Optional
 
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup, Update
 from telegram.ext import ContextTypes
 
 from app.services.tmdb import (
     TMDbItem,
+    TMDbRef,
     search as tmdb_search,
+    get_details,
     get_seasons,
-    tmdb_last_error,
 )
 from app.state import (
     SERIES_TYPES,
     STATE_MANUAL_SEASON,
     STATE_MANUAL_TITLE,
     STATE_SEARCH,
+    SelectedTitle,
     set_state,
     title_with_year,
 )
-from app.config import load_settings
+from app.config import Settings, load_settings
 from app.handlers.telegram_utils import (
     delete_safely,
     edit_message_safely,
@@ -27,91 +31,100 @@ from app.handlers.telegram_utils import (
 )
 
 PAGE_SIZE = 5
+BUTTON_LABEL_MAX_BYTES = 64
+
+
+# Static buttons/rows are immutable in PTB, so build them once and share them.
+_HOME_BUTTON = InlineKeyboardButton("🏠 Main menu", callback_data="action|home")
+_BACK_ROW = (
+    InlineKeyboardButton("⬅️ Back", callback_data="action|search"),
+    _HOME_BUTTON,
+)
+_CANCEL_ROW = (InlineKeyboardButton("❌ Cancel", callback_data="cancel|flow"),)
+_OTHER_SEASON_ROW = (
+    InlineKeyboardButton("🔢 Other season", callback_data="season|manual"),
+)
+_RESULTS_FOOTER = (
+    (InlineKeyboardButton("✍️ Manual entry", callback_data="manual|start"),),
+    _BACK_ROW,
+)
+_SEASON_FOOTER = (_OTHER_SEASON_ROW, _BACK_ROW, _CANCEL_ROW)
 
 
 def _home_button() -> InlineKeyboardButton:
-    return InlineKeyboardButton("🏠 Main menu", callback_data="action|home")
+    return _HOME_BUTTON
+
+
+@lru_cache(maxsize=64)
+def _page_button(label: str, page: int) -> InlineKeyboardButton:
+    return InlineKeyboardButton(label, callback_data=f"page|{page}")
+
+
+def _truncate_bytes(text: str, limit: int) -> str:
+    """Cut text to at most `limit` UTF-8 bytes without splitting a character."""
+    raw = text.encode("utf-8")
+    if len(raw) <= limit:
+        return text
+    return raw[:limit].decode("utf-8", errors="ignore")
 
 
 # ── Keyboards ────────────────────────────────────────────────────
 
+def _rows(buttons: list[InlineKeyboardButton], width: int = 2) -> list[list[InlineKeyboardButton]]:
+    return [buttons[i : i + width] for i in range(0, len(buttons), width)]
+
+
+@lru_cache(maxsize=64)
+def _season_button(num) -> InlineKeyboardButton:
+    return InlineKeyboardButton(f"Season {num}", callback_data=f"season|{num}")
+
+
 def build_results_keyboard(
-    results: list[TMDbItem], page: int = 0
+    results: list[TMDbRef], page: int = 0
 ) -> InlineKeyboardMarkup:
     start = page * PAGE_SIZE
     chunk = results[start : start + PAGE_SIZE]
-    buttons: list[list[InlineKeyboardButton]] = []
-    row: list[InlineKeyboardButton] = []
-    for item in chunk:
-        label = f"{item.title} ({item.year})" if item.year else item.title
-        row.append(
-            InlineKeyboardButton(
-                label[:64], callback_data=f"tmdb|{item.kind}|{item.id}"
-            )
+    buttons = _rows([
+        InlineKeyboardButton(
+            _truncate_bytes(f"{item.title} ({item.year})" if item.year else item.title, BUTTON_LABEL_MAX_BYTES),
+            callback_data=f"tmdb|{item.kind}|{item.id}",
         )
-        if len(row) == 2:
-            buttons.append(row)
-            row = []
-    if row:
-        buttons.append(row)
+        for item in chunk
+    ])
 
     pagination = []
     total_pages = (len(results) - 1) // PAGE_SIZE if results else 0
     if page > 0:
-        pagination.append(
-            InlineKeyboardButton("⬅️", callback_data=f"page|{page - 1}")
-        )
+        pagination.append(_page_button("⬅️", page - 1))
     if page < total_pages:
-        pagination.append(
-            InlineKeyboardButton("➡️", callback_data=f"page|{page + 1}")
-        )
+        pagination.append(_page_button("➡️", page + 1))
     if pagination:
         buttons.append(pagination)
 
-    buttons.append(
-        [
-            InlineKeyboardButton("✍️ Manual entry", callback_data="manual|start"),
-        ]
-    )
-    buttons.append(
-        [
-            InlineKeyboardButton("⬅️ Back", callback_data="action|search"),
-            _home_button(),
-        ]
-    )
+    buttons.extend(_RESULTS_FOOTER)
     return InlineKeyboardMarkup(buttons)
 
 
 def build_season_keyboard(seasons: list) -> InlineKeyboardMarkup:
-    buttons: list[list[InlineKeyboardButton]] = []
-    row: list[InlineKeyboardButton] = []
-    for s in seasons[:24]:
-        num = s.season_number if hasattr(s, "season_number") else s.get("season_number")
-        row.append(
-            InlineKeyboardButton(f"Season {num}", callback_data=f"season|{num}")
-        )
-        if len(row) == 2:
-            buttons.append(row)
-            row = []
-    if row:
-        buttons.append(row)
-    buttons.append(
-        [InlineKeyboardButton("🔢 Other season", callback_data="season|manual")]
-    )
-    buttons.append(
-        [
-            InlineKeyboardButton("⬅️ Back", callback_data="action|search"),
-            _home_button(),
-        ]
-    )
-    buttons.append(
-        [InlineKeyboardButton("❌ Cancel", callback_data="cancel|flow")]
-    )
+    buttons = _rows([
+        _season_button(s.season_number if hasattr(s, "season_number") else s.get("season_number"))
+        for s in seasons[:24]
+    ])
+    buttons.extend(_SEASON_FOOTER)
     return InlineKeyboardMarkup(buttons)
 
 
+# (settings, markup) for the last settings object seen; load_settings returns
+# the same object until libraries.yaml changes, so the identity check is the
+# invalidation.
+_library_keyboard: Optional[tuple[Settings, InlineKeyboardMarkup]] = None
+
+
 def build_library_keyboard() -> InlineKeyboardMarkup:
+    global _library_keyboard
     st = load_settings()
+    if _library_keyboard is not None and _library_keyboard[0] is st:
+        return _library_keyboard[1]
     buttons: list[list[InlineKeyboardButton]] = []
     for lib in st.libraries:
         buttons.append(
@@ -121,16 +134,11 @@ def build_library_keyboard() -> InlineKeyboardMarkup:
                 )
             ]
         )
-    buttons.append(
-        [
-            InlineKeyboardButton("⬅️ Back", callback_data="action|search"),
-            _home_button(),
-        ]
-    )
-    buttons.append(
-        [InlineKeyboardButton("❌ Cancel", callback_data="cancel|flow")]
-    )
-    return InlineKeyboardMarkup(buttons)
+    buttons.append(_BACK_ROW)
+    buttons.append(_CANCEL_ROW)
+    markup = InlineKeyboardMarkup(buttons)
+    _library_keyboard = (st, markup)
+    return markup
 
 
 async def _edit_message(query, text: str, reply_markup=None):
@@ -154,6 +162,24 @@ def _format_item_preview(item: TMDbItem) -> str:
     return "\n".join(lines)
 
 
+async def _show_item(update: Update, context, item: TMDbItem, text: str, markup) -> None:
+    """Replace the results message with the item preview (as a poster when available)."""
+    query = update.callback_query
+    if not item.poster:
+        await _edit_message(query, text, reply_markup=markup)
+        return
+    # Deleting the old message and sending the poster don't depend on each other.
+    await asyncio.gather(
+        delete_safely(query.message),
+        context.bot.send_photo(
+            chat_id=update.effective_chat.id,
+            photo=item.poster,
+            caption=text,
+            reply_markup=markup,
+        ),
+    )
+
+
 # ── Handlers ─────────────────────────────────────────────────────
 
 async def handle_page(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -183,26 +209,35 @@ async def handle_tmdb_select(update: Update, context: ContextTypes.DEFAULT_TYPE)
     if len(parts) != 3:
         return
     _, kind, id_raw = parts
-    item = None
-    results: list[TMDbItem] = context.user_data.get("tmdb_results") or []
+    ref = None
+    results: list[TMDbRef] = context.user_data.get("tmdb_results") or []
     try:
         item_id = int(id_raw)
     except ValueError:
         return
     for r in results:
         if r.kind == kind and r.id == item_id:
-            item = r
+            ref = r
             break
-    if not item:
+    if not ref:
         await _edit_message(query, "Item not found. Search again.")
         return
 
-    context.user_data["selected_tmdb"] = {
-        "id": item.id,
-        "kind": kind,
-        "title": item.title,
-        "year": item.year,
-    }
+    # Only compact refs are kept per user; fetch poster/overview now. For
+    # shows, the season list is fetched alongside.
+    if kind == "tv":
+        item, seasons = await asyncio.gather(
+            asyncio.to_thread(get_details, kind, item_id),
+            asyncio.to_thread(get_seasons, item_id),
+        )
+    else:
+        item = await asyncio.to_thread(get_details, kind, item_id)
+    if not item:
+        item = TMDbItem(id=ref.id, title=ref.title, year=ref.year, kind=ref.kind)
+
+    context.user_data["selected_tmdb"] = SelectedTitle(
+        id=item.id, kind=kind, title=item.title, year=item.year,
+    )
     context.user_data["pending_title"] = item.title
     context.user_data["pending_year"] = item.year
 
@@ -214,7 +249,6 @@ async def handle_tmdb_select(update: Update, context: ContextTypes.DEFAULT_TYPE)
         st = load_settings()
         existing_lib = find_existing_library(item.title, item.year, st.libraries)
 
-        seasons = await asyncio.to_thread(get_seasons, item.id)
         season_markup_buttons = []
 
         if existing_lib:
@@ -230,34 +264,15 @@ async def handle_tmdb_select(update: Update, context: ContextTypes.DEFAULT_TYPE)
         else:
             context.user_data.pop("auto_library", None)
 
-        if seasons:
-            row: list[InlineKeyboardButton] = []
-            for s in seasons[:24]:
-                row.append(
-                    InlineKeyboardButton(f"Season {s.season_number}", callback_data=f"season|{s.season_number}")
-                )
-                if len(row) == 2:
-                    season_markup_buttons.append(row)
-                    row = []
-            if row:
-                season_markup_buttons.append(row)
-
-        season_markup_buttons.append(
-            [InlineKeyboardButton("🔢 Other season", callback_data="season|manual")]
-        )
+        season_markup_buttons.extend(_rows([_season_button(s.season_number) for s in seasons[:24]]))
+
+        season_markup_buttons.append(_OTHER_SEASON_ROW)
         if existing_lib:
             season_markup_buttons.append(
                 [InlineKeyboardButton("📂 Change library", callback_data="action|search")]
             )
-        season_markup_buttons.append(
-            [
-                InlineKeyboardButton("⬅️ Back", callback_data="action|search"),
-                _home_button(),
-            ]
-        )
-        season_markup_buttons.append(
-            [InlineKeyboardButton("❌ Cancel", callback_data="cancel|flow")]
-        )
+        season_markup_buttons.append(_BACK_ROW)
+        season_markup_buttons.append(_CANCEL_ROW)
         markup = InlineKeyboardMarkup(season_markup_buttons)
 
         text = f"{_format_item_preview(item)}\n\nChoose a season:"
@@ -269,16 +284,7 @@ async def handle_tmdb_select(update: Update, context: ContextTypes.DEFAULT_TYPE)
             if existing_lib:
                 text += f"\n📁 Auto-detected: {existing_lib['name']}"
 
-        if item.poster:
-            await delete_safely(query.message)
-            await context.bot.send_photo(
-                chat_id=update.effective_chat.id,
-                photo=item.poster,
-                caption=text,
-                reply_markup=markup,
-            )
-        else:
-            await _edit_message(query, text, reply_markup=markup)
+        await _show_item(update, context, item, text, markup)
         return
 
     # Movie → auto-detect library or go to library selection
@@ -321,20 +327,12 @@ async def handle_tmdb_select(update: Update, context: ContextTypes.DEFAULT_TYPE)
 
     markup = build_library_keyboard()
     text = f"{_format_item_preview(item)}\n\nSelect destination library:"
-    if item.poster:
-        await delete_safely(query.message)
-        await context.bot.send_photo(
-            chat_id=update.effective_chat.id,
-            photo=item.poster,
-            caption=text,
-            reply_markup=markup,
-        )
-    else:
-        await _edit_message(query, text, reply_markup=markup)
+    await _show_item(update, context, item, text, markup)
 
 
 async def handle_season(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
+    ud = context.user_data
     await safe_answer(query)
     parts = (query.data or "").split("|")
     if len(parts) != 2:
@@ -344,18 +342,9 @@ async def handle_season(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if val == "manual":
         await _edit_message(query, 
             "Type the season number.",
-            reply_markup=InlineKeyboardMarkup(
-                [
-                    [
-                        InlineKeyboardButton(
-                            "⬅️ Back", callback_data="action|search"
-                        ),
-                        _home_button(),
-                    ]
-                ]
-            ),
+            reply_markup=InlineKeyboardMarkup([_BACK_ROW]),
         )
-        set_state(context.user_data, STATE_MANUAL_SEASON)
+        set_state(ud, STATE_MANUAL_SEASON)
         return
 
     try:
@@ -363,26 +352,26 @@ async def handle_season(update: Update, context: ContextTypes.DEFAULT_TYPE):
     except ValueError:
         return
 
-    context.user_data["pending_season"] = season_num
-    sel = context.user_data.get("selected_tmdb") or {}
-    title = sel.get("title") or context.user_data.get("pending_title", "Content")
-    year = sel.get("year") or context.user_data.get("pending_year")
-    kind = sel.get("kind", "movie")
+    ud["pending_season"] = season_num
+    sel: SelectedTitle | None = ud.get("selected_tmdb")
+    title = (sel and sel.title) or ud.get("pending_title", "Content")
+    year = (sel and sel.year) or ud.get("pending_year")
+    kind = sel.kind if sel else "movie"
 
     # If a series auto-library was detected, skip library selection
-    auto_lib = context.user_data.pop("auto_library", None)
+    auto_lib = ud.pop("auto_library", None)
     if auto_lib:
         from app.handlers.download import set_destination, queue_download_batch
 
         full_title = title_with_year(title, year)
-        context.user_data["pending_title"] = full_title
+        ud["pending_title"] = full_title
         if kind != "tv":
-            context.user_data.pop("pending_season", None)
+            ud.pop("pending_season", None)
 
         download_dir = await set_destination(update, context, auto_lib, title, year, season_num)
 
         pending_items: list = context.chat_data.pop("pending_links", [])
-        context.user_data.pop("state", None)
+        ud.pop("state", None)
 
         if pending_items:
             await _edit_message(query, f"📁 {auto_lib['name']} — Season {season_num:02d}\nQueuing {len(pending_items)} item(s)...")
@@ -403,6 +392,7 @@ async def handle_season(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
 async def handle_library(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
+    ud = context.user_data
     await safe_answer(query)
     parts = (query.data or "").split("|")
     if len(parts) != 2:
@@ -420,40 +410,38 @@ async def handle_library(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await _edit_message(query, f"Library '{lib_name}' not found.")
         return
 
-    sel = context.user_data.get("selected_tmdb") or {}
-    title = sel.get("title") or context.user_data.get("pending_title", "Content")
-    year = sel.get("year") or context.user_data.get("pending_year")
-    kind = sel.get("kind", "movie")
+    sel: SelectedTitle | None = ud.get("selected_tmdb")
+    title = (sel and sel.title) or ud.get("pending_title", "Content")
+    year = (sel and sel.year) or ud.get("pending_year")
+    kind = sel.kind if sel else "movie"
     lib_type = library.get("type")
-    season = context.user_data.get("pending_season") if kind == "tv" or lib_type in SERIES_TYPES else None
+    season = ud.get("pending_season") if kind == "tv" or lib_type in SERIES_TYPES else None
 
     if lib_type in SERIES_TYPES and season is None:
-        set_state(context.user_data, STATE_MANUAL_SEASON)
+        set_state(ud, STATE_MANUAL_SEASON)
         await _edit_message(
             query,
             f"{title}\n\nType the season number.",
-            reply_markup=InlineKeyboardMarkup(
-                [[InlineKeyboardButton("❌ Cancel", callback_data="cancel|flow")]]
-            ),
+            reply_markup=InlineKeyboardMarkup([_CANCEL_ROW]),
         )
         return
 
     # Clear stale season for movies
     if lib_type not in SERIES_TYPES and kind != "tv":
-        context.user_data.pop("pending_season", None)
+        ud.pop("pending_season", None)
 
     from app.handlers.download import set_destination, queue_download_batch
 
     # Build full title with year for display and naming consistency
     full_title = title_with_year(title, year)
-    context.user_data["pending_title"] = full_title
+    ud["pending_title"] = full_title
 
     download_dir = await set_destination(
         update, context, library, title, year, season
     )
 
     pending_items: list = context.chat_data.pop("pending_links", [])
-    context.user_data.pop("state", None)
+    ud.pop("state", None)
 
     if pending_items:
         count = len(pending_items)
@@ -466,15 +454,15 @@ async def handle_library(update: Update, context: ContextTypes.DEFAULT_TYPE):
             download_dir, full_title, season, year,
         )
         # For movies, clear destination after queuing so next file starts fresh
-        if library.get("type") not in ("series", "anime"):
+        if library.get("type") not in SERIES_TYPES:
             context.chat_data.pop("download_dir", None)
             context.chat_data.pop("active_library", None)
             context.chat_data.pop("season_hint", None)
             context.chat_data.pop("selected_type", None)
-            context.user_data.pop("pending_title", None)
-            context.user_data.pop("pending_year", None)
-            context.user_data.pop("pending_season", None)
-            context.user_data.pop("selected_tmdb", None)
+            ud.pop("pending_title", None)
+            ud.pop("pending_year", None)
+            ud.pop("pending_season", None)
+            ud.pop("selected_tmdb", None)
     else:
         await _edit_message(
             query,
@@ -488,16 +476,7 @@ async def handle_manual_entry(update: Update, context: ContextTypes.DEFAULT_TYPE
     await safe_answer(query)
     await _edit_message(query, 
         "Type the title:",
-        reply_markup=InlineKeyboardMarkup(
-            [
-                [
-                    InlineKeyboardButton(
-                        "⬅️ Back", callback_data="action|search"
-                    ),
-                    _home_button(),
-                ]
-            ]
-        ),
+        reply_markup=InlineKeyboardMarkup([_BACK_ROW]),
     )
     set_state(context.user_data, STATE_MANUAL_TITLE)
 
@@ -505,10 +484,11 @@ async def handle_manual_entry(update: Update, context: ContextTypes.DEFAULT_TYPE
 async def handle_autolib(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle the auto-detected library button — clears it so user picks manually."""
     query = update.callback_query
+    ud = context.user_data
     await safe_answer(query)
-    context.user_data.pop("auto_library", None)
-    sel = context.user_data.get("selected_tmdb") or {}
-    title = sel.get("title", "Content")
+    ud.pop("auto_library", None)
+    sel: SelectedTitle | None = ud.get("selected_tmdb")
+    title = sel.title if sel else "Content"
     markup = build_library_keyboard()
     text = f"{title}\n\nSelect destination library:"
     await _edit_message(query, text, reply_markup=markup)
@@ -3,11 +3,24 @@
 from __future__ import annotations
 
 import asyncio
+import functools
 import logging
 
 from telegram.error import BadRequest, RetryAfter, TimedOut
 
 
+def flow_locked(handler):
+    """Serialize a user's flow handlers so rapid taps cannot interleave mid-await."""
+
+    @functools.wraps(handler)
+    async def wrapper(update, context, *args, **kwargs):
+        lock = context.user_data.setdefault("_flow_lock", asyncio.Lock())
+        async with lock:
+            return await handler(update, context, *args, **kwargs)
+
+    return wrapper
+
+
 async def safe_answer(query, *, max_retries: int = 2) -> bool:
     for attempt in range(max_retries):
         try:
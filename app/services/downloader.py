@@ -16,6 +16,10 @@ ProgressCb = Callable[[int, str], Awaitable[None]]
 PROGRESS_MIN_STEP = 2
 PROGRESS_MIN_INTERVAL = 5.0
 
+# Read tdl output in large chunks; it can print dozens of status lines per second.
+READ_CHUNK_SIZE = 65536
+RX_PERCENT = re.compile(r"(\d{1,3})(?:\.\d+)?%")
+
 
 async def kill_stale_tdl() -> None:
     try:
@@ -73,10 +77,11 @@ async def run_download(
                 except Exception:
                     pass
 
+            buf = b""
             while True:
                 try:
-                    line = await asyncio.wait_for(
-                        proc.stdout.readline(), timeout=idle_timeout
+                    chunk = await asyncio.wait_for(
+                        proc.stdout.read(READ_CHUNK_SIZE), timeout=idle_timeout
                     )
                 except asyncio.TimeoutError:
                     logging.error("Download idle for %ss, terminating: %s", idle_timeout, display_cmd)
@@ -87,34 +92,48 @@ async def run_download(
                         pass
                     break
 
-                if not line:
+                if chunk:
+                    buf += chunk
+                    *done, buf = buf.split(b"\n")
+                elif buf:
+                    # EOF: flush a trailing line that had no newline.
+                    done, buf = [buf], b""
+                else:
                     break
 
-                last_line = line.decode().strip()
-                if last_line:
-                    lines.append(last_line)
-                    if len(lines) > max_tail:
-                        lines.pop(0)
-
-                if on_progress:
-                    percents = re.findall(r"(\d{1,3})(?:\.\d+)?%", last_line)
-                    if percents:
-                        pct = int(float(percents[-1]))
-                        if pct > 100:
-                            pct = 100
-                        if pct < last_percent and last_percent >= 0:
-                            continue
-                        now = time.time()
-                        if (
-                            pct != last_percent
-                            and (pct - last_percent >= PROGRESS_MIN_STEP)
-                        ) or (now - last_emit >= PROGRESS_MIN_INTERVAL):
-                            last_percent = pct
-                            last_emit = now
-                            try:
-                                await on_progress(min(100, pct), last_line)
-                            except Exception as cb_err:
-                                logging.debug("Progress callback failed: %s", cb_err)
+                progress_line = None
+                for raw in done:
+                    line = raw.decode(errors="replace").strip()
+                    if not line:
+                        continue
+                    last_line = line
+                    lines.append(line)
+                    if on_progress and "%" in line:
+                        progress_line = line
+                if len(lines) > max_tail:
+                    del lines[:-max_tail]
+
+                if progress_line is None:
+                    continue
+                percents = RX_PERCENT.findall(progress_line)
+                if not percents:
+                    continue
+                pct = int(float(percents[-1]))
+                if pct > 100:
+                    pct = 100
+                if pct < last_percent and last_percent >= 0:
+                    continue
+                now = time.time()
+                if (
+                    pct != last_percent
+                    and (pct - last_percent >= PROGRESS_MIN_STEP)
+                ) or (now - last_emit >= PROGRESS_MIN_INTERVAL):
+                    last_percent = pct
+                    last_emit = now
+                    try:
+                        await on_progress(min(100, pct), progress_line)
+                    except Exception as cb_err:
+                        logging.debug("Progress callback failed: %s", cb_err)
 
             await proc.wait()
             if unregister_pid and proc.pid:
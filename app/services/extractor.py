@@ -9,13 +9,23 @@ import shutil
 import subprocess
 import tarfile
 import zipfile
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+from app.services.walk import file_ext, iter_files
+
 VIDEO_EXT = {
     ".mkv", ".mp4", ".avi", ".mov", ".ts", ".m4v",
     ".webm", ".flv", ".wmv", ".mpg", ".mpeg", ".m2ts", ".mts",
 }
 
+# Destination directories extracted at once; extraction is mostly disk- or
+# subprocess-bound, so this does not scale with CPU count.
+EXTRACT_WORKERS = 4
+
+RX_PART_SUFFIX = re.compile(r"\.part\d+$")
+RX_PART_INDEX = re.compile(r"\.part(\d+)")
+
 ARCHIVE_SUFFIXES = {
     ".zip", ".rar", ".7z",
     ".001", ".002", ".003",
@@ -23,28 +33,27 @@ ARCHIVE_SUFFIXES = {
 }
 
 
+# One pass over the name: any dot-segment after the stem that is a known
+# archive suffix, .rNN or .partN, or a compound tarball ending.
+RX_ARCHIVE_PART = re.compile(
+    r"\.(?:"
+    + "|".join(re.escape(s[1:]) for s in sorted(ARCHIVE_SUFFIXES))
+    + r"|r\d+|part\d+)(?=\.|$)"
+    r"|\.tar\.(?:gz|bz2|xz)$",
+    re.I,
+)
+
+
 def _is_archive_part(path: Path) -> bool:
-    suffixes = [s.lower() for s in path.suffixes]
-    if not suffixes:
+    name = path.name
+    if name.endswith("."):
         return False
-    for s in suffixes:
-        if s in ARCHIVE_SUFFIXES:
-            return True
-        if s.startswith(".r") and len(s) >= 3 and s[2:].isdigit():
-            return True
-        if s.startswith(".part") and s[5:].rstrip(".").isdigit():
-            return True
-    # compound suffixes like .tar.gz
-    name_lower = path.name.lower()
-    if name_lower.endswith(".tar.gz") or name_lower.endswith(".tar.bz2") or name_lower.endswith(".tar.xz"):
-        return True
-    return False
+    return RX_ARCHIVE_PART.search(name.lstrip(".")) is not None
 
 
 def _iter_archives(root: Path):
-    for p in sorted(root.rglob("*")):
-        if p.is_file() and _is_archive_part(p):
-            yield p
+    paths = (Path(e.path) for e in iter_files(root))
+    yield from sorted(p for p in paths if _is_archive_part(p))
 
 
 def _detect_archive_type(path: Path) -> str | None:
@@ -85,7 +94,7 @@ def _detect_archive_type(path: Path) -> str | None:
 
 def _archive_key(path: Path) -> str:
     stem = path.stem.lower()
-    stem = re.sub(r"\.part\d+$", "", stem)
+    stem = RX_PART_SUFFIX.sub("", stem)
     ext = path.suffix.lower()
     if ext in {".rar", ".zip", ".7z"}:
         return f"{stem}__{ext.lstrip('.')}"
@@ -100,7 +109,7 @@ def _volume_index(path: Path) -> int:
         return 0
 
     for suf in reversed(suffixes):
-        match = re.match(r"\.part(\d+)", suf)
+        match = RX_PART_INDEX.match(suf)
         if match:
             return int(match.group(1))
     for suf in suffixes:
@@ -193,9 +202,8 @@ _EXTRACTORS = {
 
 def _cleanup_archives(root: Path, key: str) -> None:
     removed = 0
-    for p in root.rglob("*"):
-        if not p.is_file():
-            continue
+    for entry in iter_files(root):
+        p = Path(entry.path)
         if _archive_key(p) != key:
             continue
         if not _is_archive_part(p):
@@ -209,12 +217,43 @@ def _cleanup_archives(root: Path, key: str) -> None:
 
 
 def _has_video_files(directory: Path) -> bool:
-    for p in directory.rglob("*"):
-        if p.is_file() and p.suffix.lower() in VIDEO_EXT:
-            return True
+    return any(file_ext(e.name) in VIDEO_EXT for e in iter_files(directory))
+
+
+def _extract_one(arc: Path, archive_type: str) -> bool:
+    extractor = _EXTRACTORS[archive_type]
+    try:
+        logging.info("Extracting %s (%s)", arc, archive_type)
+        extractor(arc, arc.parent)
+        return True
+    except subprocess.TimeoutExpired:
+        logging.error("Extraction timeout for %s", arc)
+    except Exception as e:
+        logging.error("Error extracting %s (%s): %s", arc, archive_type, e)
     return False
 
 
+def _extract_group(jobs: list[tuple[Path, str, str]]) -> list[tuple[Path, bool]]:
+    """Extract archives whose destinations may overlap one after another."""
+    return [(arc, _extract_one(arc, archive_type)) for arc, archive_type, _ in jobs]
+
+
+def _group_by_destination(root: Path, jobs: list[tuple[Path, str, str]]) -> list[list[tuple[Path, str, str]]]:
+    """Split jobs into groups whose extraction trees cannot overlap.
+
+    An archive may write anywhere below its parent directory, so jobs are
+    keyed by the top-level subdirectory of root they live in; an archive
+    directly in root could touch any of them, which forces a single group.
+    """
+    groups: dict[str, list[tuple[Path, str, str]]] = {}
+    for job in jobs:
+        rel = job[0].parent.relative_to(root).parts
+        if not rel:
+            return [jobs]
+        groups.setdefault(rel[0], []).append(job)
+    return list(groups.values())
+
+
 def extract_archives(root: Path, max_passes: int = 3) -> None:
     processed: set[str] = set()
     for pass_num in range(1, max_passes + 1):
@@ -225,31 +264,36 @@ def extract_archives(root: Path, max_passes: int = 3) -> None:
             break
 
         logging.info("extract_archives pass %d: found %d new archives", pass_num, len(new_archives))
+        jobs: list[tuple[Path, str, str]] = []
         for arc in new_archives:
             archive_type = _detect_archive_type(arc)
             key = _archive_key(arc)
             if key in processed:
                 continue
+            processed.add(key)
             if not archive_type:
                 logging.warning("Skipping unknown archive type: %s", arc)
-                processed.add(key)
                 continue
-            processed.add(key)
-            extractor = _EXTRACTORS.get(archive_type)
-            if not extractor:
+            if archive_type not in _EXTRACTORS:
                 logging.warning("No extractor for type=%s: %s", archive_type, arc)
                 continue
-            dest = arc.parent
-            try:
-                logging.info("Extracting %s (%s)", arc, archive_type)
-                extractor(arc, dest)
-                # Only cleanup if we got video files out
-                if _has_video_files(dest):
-                    _cleanup_archives(root, key)
-                    logging.info("Extraction finished for %s", arc)
-                else:
-                    logging.warning("No video files after extracting %s; keeping archives", arc)
-            except subprocess.TimeoutExpired:
-                logging.error("Extraction timeout for %s", arc)
-            except Exception as e:
-                logging.error("Error extracting %s (%s): %s", arc, archive_type, e)
+            jobs.append((arc, archive_type, key))
+
+        # Every extractor overwrites existing files, so archives that could
+        # write into the same tree run serially; only disjoint subdirectories
+        # run concurrently (unrar/7z are subprocesses, zip/tar release the GIL
+        # on I/O). Cleanup stays serial so the video check never races.
+        groups = _group_by_destination(root, jobs)
+        workers = min(EXTRACT_WORKERS, len(groups)) or 1
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            extracted = {arc: ok for pairs in pool.map(_extract_group, groups) for arc, ok in pairs}
+
+        for arc, _, key in jobs:
+            if not extracted[arc]:
+                continue
+            # Only cleanup if we got video files out
+            if _has_video_files(arc.parent):
+                _cleanup_archives(root, key)
+                logging.info("Extraction finished for %s", arc)
+            else:
+                logging.warning("No video files after extracting %s; keeping archives", arc)
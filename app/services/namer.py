@@ -5,16 +5,25 @@ Plex requires ASCII-only names: no accents, no ñ, no special chars.
 """
 
 import logging
+import os
 import re
 import unicodedata
+from functools import lru_cache
 from pathlib import Path
 from typing import Optional
 
+from app.services.walk import file_ext, iter_files
+
 RX_SE = re.compile(r"S?(\d{1,2})[xEex](\d{1,3})(?:[Ee\-](\d{1,3}))?", re.I)
 RX_E_ONLY = re.compile(r"(?<![A-Za-z])E(\d{1,3})(?!\d)", re.I)
 RX_YEAR_GUARD = re.compile(r"(19\d{2}|20\d{2})")
 _RES_HEIGHTS = {"480", "576", "720", "108", "360"}
 RX_THREE = re.compile(r"(?<!\d)(\d)(\d{2})(?!\d)")
+# Every season/episode pattern needs a digit (\d, so any Unicode digit);
+# names without one skip the regexes.
+_DIGITS = frozenset("0123456789")
+RX_WHITESPACE = re.compile(r"\s+")
+RX_TRAILING_YEAR = re.compile(r"\s*\(\d{4}\)$")
 
 VIDEO_EXT = {
     ".mkv", ".mp4", ".avi", ".mov", ".ts", ".m4v",
@@ -25,10 +34,13 @@ INVALID_FS_CHARS = set('<>:"/\\|?*')
 
 def _ascii_safe(text: str) -> str:
     """Normalize to closest ASCII: ñ→n, é→e, etc."""
+    if text.isascii():
+        return text
     nfkd = unicodedata.normalize("NFKD", text)
     return nfkd.encode("ascii", "ignore").decode("ascii")
 
 
+@lru_cache(maxsize=4096)
 def safe_title(title: str) -> str:
     """
     Sanitize a title for Plex filesystem use:
@@ -40,13 +52,15 @@ def safe_title(title: str) -> str:
         return "Content"
     cleaned = _ascii_safe(title)
     cleaned = "".join(" " if ch in INVALID_FS_CHARS else ch for ch in cleaned)
-    cleaned = re.sub(r"\s+", " ", cleaned).strip().strip(".")
+    cleaned = RX_WHITESPACE.sub(" ", cleaned).strip().strip(".")
     return cleaned or "Content"
 
 
 def parse_season_episode(
     name: str, season_hint: Optional[int] = None
 ) -> tuple[Optional[int], Optional[int]]:
+    if _DIGITS.isdisjoint(name) and (name.isascii() or not any(c.isdigit() for c in name)):
+        return None, None
     m = RX_SE.search(name)
     if m:
         s, e = int(m.group(1)), int(m.group(2))
@@ -70,77 +84,130 @@ def target_name(
     return f"S{season:02d}E{episode:02d} - {title}{ext}"
 
 
-def rename_video(path: Path, title: str, season_hint: Optional[int]) -> Path:
-    season, episode = parse_season_episode(path.name, season_hint)
-    ext = path.suffix.lower()
-    if ext not in VIDEO_EXT:
-        return path
+def _dir_names(directory: str | Path) -> set[str]:
+    """Snapshot a directory's entry names for in-memory collision checks."""
+    with os.scandir(directory) as it:
+        return {e.name for e in it}
+
+
+def _free_name(name: str, ext: str, taken: set[str]) -> str:
+    if name not in taken:
+        return name
+    base = name[: len(name) - len(ext)]
+    n = 1
+    while f"{base}-dup{n}{ext}" in taken:
+        n += 1
+    return f"{base}-dup{n}{ext}"
+
+
+def _videos_by_dir(root: Path) -> dict[str, list[str]]:
+    """Video file names under root, grouped by their directory path."""
+    grouped: dict[str, list[str]] = {}
+    for e in iter_files(root):
+        if file_ext(e.name) in VIDEO_EXT:
+            grouped.setdefault(os.path.dirname(e.path), []).append(e.name)
+    return grouped
+
 
+def _rename_in_dir(dirpath: str, name: str, new_name: str, ext: str, taken: set[str]) -> str:
+    """Rename dirpath/name to a free variant of new_name; returns the name used."""
+    final = _free_name(new_name, ext, taken)
+    os.rename(os.path.join(dirpath, name), os.path.join(dirpath, final))
+    taken.discard(name)
+    taken.add(final)
+    return final
+
+
+def _episode_name(name: str, title: str, season_hint: Optional[int]) -> Optional[str]:
+    season, episode = parse_season_episode(name, season_hint)
+    ext = file_ext(name)
     if season is not None and episode is not None:
-        new_name = f"S{season:02d}E{episode:02d} - {title}{ext}"
-    elif season_hint is not None and episode is not None:
-        new_name = f"S{season_hint:02d}E{episode:02d} - {title}{ext}"
-    else:
-        logging.warning("rename_video: cannot determine season/episode for %s (season=%s, episode=%s, hint=%s), keeping original", path.name, season, episode, season_hint)
-        return path
-
-    target = path.with_name(new_name)
-    if target == path:
-        return path
-    if target.exists():
-        base = target.stem
-        suffix = target.suffix
-        n = 1
-        while target.exists():
-            target = path.with_name(f"{base}-dup{n}{suffix}")
-            n += 1
-    logging.info("rename_video: %s -> %s", path.name, target.name)
-    path.rename(target)
-    return target
-
-
-def bulk_rename(root: Path, title: str, season_hint: Optional[int]) -> None:
+        return f"S{season:02d}E{episode:02d} - {title}{ext}"
+    if season_hint is not None and episode is not None:
+        return f"S{season_hint:02d}E{episode:02d} - {title}{ext}"
+    logging.warning("rename_video: cannot determine season/episode for %s (season=%s, episode=%s, hint=%s), keeping original", name, season, episode, season_hint)
+    return None
+
+
+def _rename_episode(
+    dirpath: str, name: str, title: str, season_hint: Optional[int], taken: Optional[set[str]] = None
+) -> str:
+    """Rename one video to SxxExx form; returns the resulting file name.
+
+    `taken` holds the names already present in dirpath; callers renaming many
+    siblings pass one shared set so collisions are checked in memory instead
+    of with a stat per candidate.
+    """
+    ext = file_ext(name)
+    if ext not in VIDEO_EXT:
+        return name
+    new_name = _episode_name(name, title, season_hint)
+    if new_name is None or new_name == name:
+        return name
+    if taken is None:
+        taken = _dir_names(dirpath)
+    final = _rename_in_dir(dirpath, name, new_name, ext, taken)
+    logging.info("rename_video: %s -> %s", name, final)
+    return final
+
+
+def rename_video(
+    path: Path, title: str, season_hint: Optional[int], taken: Optional[set[str]] = None
+) -> Path:
+    """Path-based wrapper around _rename_episode."""
+    return path.with_name(_rename_episode(str(path.parent), path.name, title, season_hint, taken))
+
+
+def bulk_rename(root: Path, title: str, season_hint: Optional[int]) -> int:
+    """Rename every video under root to SxxExx form; returns how many were renamed."""
     logging.info("bulk_rename: root=%s title=%s season_hint=%s", root, title, season_hint)
-    video_files = [p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in VIDEO_EXT]
-    logging.info("bulk_rename: found %d video files", len(video_files))
-    for p in video_files:
-        original = p.name
-        try:
-            result = rename_video(p, title, season_hint)
-            if result == p:
-                logging.info("bulk_rename: skipped %s (no rename needed)", original)
-        except Exception as e:
-            logging.error("bulk_rename: failed to rename %s: %s", original, e)
+    videos = _videos_by_dir(root)
+    logging.info("bulk_rename: found %d video files", sum(map(len, videos.values())))
+    renamed = 0
+    for dirpath, names in videos.items():
+        taken: Optional[set[str]] = None
+        for original in names:
+            try:
+                if taken is None:
+                    taken = _dir_names(dirpath)
+                if _rename_episode(dirpath, original, title, season_hint, taken) == original:
+                    logging.info("bulk_rename: skipped %s (no rename needed)", original)
+                else:
+                    renamed += 1
+            except Exception as e:
+                logging.error("bulk_rename: failed to rename %s: %s", original, e)
+    return renamed
 
 
 def _movie_title_with_year(title: str, year: Optional[int]) -> str:
     sanitized = safe_title(title)
-    sanitized = re.sub(r"\s*\(\d{4}\)$", "", sanitized).strip()
+    sanitized = RX_TRAILING_YEAR.sub("", sanitized).strip()
     if year:
         sanitized = f"{sanitized} ({year})"
     return sanitized or "Content"
 
 
-def rename_movie_files(root: Path, title: str, year: Optional[int]) -> None:
+def rename_movie_files(root: Path, title: str, year: Optional[int]) -> int:
+    """Rename every video under root to `Title (Year)`; returns how many were renamed."""
     target_base = _movie_title_with_year(title, year)
     logging.info("rename_movie_files: root=%s title=%s year=%s target_base=%s", root, title, year, target_base)
-    video_files = [p for p in root.rglob("*") if p.is_file() and p.suffix.lower() in VIDEO_EXT]
-    logging.info("rename_movie_files: found %d video files", len(video_files))
-    for p in video_files:
-        original = p.name
-        try:
-            target = p.with_name(f"{target_base}{p.suffix.lower()}")
-            if target == p:
-                logging.info("rename_movie_files: skipped %s (already named)", original)
-                continue
-            if target.exists():
-                base = target.stem
-                suffix = target.suffix
-                n = 1
-                while target.exists():
-                    target = p.with_name(f"{base}-dup{n}{suffix}")
-                    n += 1
-            logging.info("rename_movie_files: %s -> %s", original, target.name)
-            p.rename(target)
-        except Exception as e:
-            logging.error("rename_movie_files: failed to rename %s: %s", original, e)
+    videos = _videos_by_dir(root)
+    logging.info("rename_movie_files: found %d video files", sum(map(len, videos.values())))
+    renamed = 0
+    for dirpath, names in videos.items():
+        taken: Optional[set[str]] = None
+        for original in names:
+            try:
+                ext = file_ext(original)
+                new_name = f"{target_base}{ext}"
+                if new_name == original:
+                    logging.info("rename_movie_files: skipped %s (already named)", original)
+                    continue
+                if taken is None:
+                    taken = _dir_names(dirpath)
+                final = _rename_in_dir(dirpath, original, new_name, ext, taken)
+                logging.info("rename_movie_files: %s -> %s", original, final)
+                renamed += 1
+            except Exception as e:
+                logging.error("rename_movie_files: failed to rename %s: %s", original, e)
+    return renamed
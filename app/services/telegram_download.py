@@ -18,13 +18,14 @@ from typing import Optional
 from app.services.namer import safe_title
 
 TELEGRAM_MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB
+RX_SAFE_EXT = re.compile(r"\.[A-Za-z0-9]{1,10}")
 
 
 def _safe_download_filename(filename: Optional[str]) -> str:
     raw = os.path.basename(filename or "file")
     stem, ext = os.path.splitext(raw)
     clean_stem = safe_title(stem or "file")
-    clean_ext = ext.lower() if re.fullmatch(r"\.[A-Za-z0-9]{1,10}", ext or "") else ""
+    clean_ext = ext.lower() if RX_SAFE_EXT.fullmatch(ext or "") else ""
     return f"{clean_stem}{clean_ext}"
 
 
@@ -2,17 +2,33 @@
 
 import logging
 import os
+import threading
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional
+from typing import NamedTuple, Optional
 
 import requests
 
 TMDB_BASE = "https://api.themoviedb.org/3"
 TMDB_IMG_BASE = "https://image.tmdb.org/t/p"
-_tmdb_last_error: Optional[str] = None
+MISSING_KEY_ERROR = "Missing TMDB_API_KEY"
 
+# Shared session: reuses the TCP/TLS connection to TMDb across lookups.
+_session = requests.Session()
 
-@dataclass
+# In-memory TTL/LRU cache for successful lookups. Users retry the same
+# titles and tap the same shows, so repeat hits skip the network entirely.
+CACHE_TTL = 3600.0
+CACHE_MAX_ENTRIES = 512
+_cache: "OrderedDict[tuple, tuple[float, object]]" = OrderedDict()
+_cache_lock = threading.Lock()
+# Striped fetch locks: concurrent lookups of the same key make one request.
+_fetch_locks = [threading.Lock() for _ in range(16)]
+_MISS = object()
+
+
+@dataclass(slots=True, frozen=True)
 class TMDbItem:
     id: int
     title: str
@@ -24,24 +40,66 @@ class TMDbItem:
     overview: Optional[str] = None
 
 
-@dataclass
+class TMDbRef(NamedTuple):
+    """Compact handle kept in per-user state; full details are re-fetched on selection."""
+    kind: str
+    id: int
+    title: str
+    year: Optional[int]
+
+
+@dataclass(slots=True, frozen=True)
 class TMDbSeason:
     season_number: int
 
 
-def tmdb_last_error() -> Optional[str]:
-    return _tmdb_last_error
+def to_refs(items: list[TMDbItem]) -> list[TMDbRef]:
+    return [TMDbRef(i.kind, i.id, i.title, i.year) for i in items]
 
 
 def _headers() -> Optional[dict]:
     token = os.getenv("TMDB_API_KEY")
     if not token:
-        global _tmdb_last_error
-        _tmdb_last_error = "Missing TMDB_API_KEY"
         return None
     return {"Authorization": f"Bearer {token}"}
 
 
+def _cache_get(key: tuple):
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is None:
+            return _MISS
+        stored_at, value = hit
+        if time.monotonic() - stored_at > CACHE_TTL:
+            del _cache[key]
+            return _MISS
+        _cache.move_to_end(key)
+        return value
+
+
+def _cache_put(key: tuple, value) -> None:
+    with _cache_lock:
+        _cache[key] = (time.monotonic(), value)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_MAX_ENTRIES:
+            _cache.popitem(last=False)
+
+
+def _cached(key: tuple, fetch):
+    """Return (value, error) for key; fetch() returns the same pair and is cached only on success."""
+    value = _cache_get(key)
+    if value is not _MISS:
+        return value, None
+    with _fetch_locks[hash(key) % len(_fetch_locks)]:
+        value = _cache_get(key)
+        if value is not _MISS:
+            return value, None
+        value, err = fetch()
+        if err is None:
+            _cache_put(key, value)
+        return value, err
+
+
 def _extract_year(date_str: Optional[str]) -> Optional[int]:
     if not date_str:
         return None
@@ -57,84 +115,102 @@ def _poster_url(path: Optional[str], size: str = "w500") -> Optional[str]:
     return f"{TMDB_IMG_BASE}/{size}{path}"
 
 
-def search(query: str, limit: int = 10) -> list[TMDbItem]:
-    global _tmdb_last_error
+def _item_from_json(d: dict, kind: str) -> Optional[TMDbItem]:
+    title = d.get("title") if kind == "movie" else d.get("name")
+    if not title:
+        return None
+    year_field = (
+        d.get("release_date") if kind == "movie" else d.get("first_air_date")
+    )
+    return TMDbItem(
+        id=int(d["id"]),
+        title=title,
+        year=_extract_year(year_field),
+        kind=kind,
+        poster=_poster_url(d.get("poster_path")),
+        popularity=float(d.get("popularity") or 0),
+        rating=float(d.get("vote_average") or 0),
+        overview=d.get("overview"),
+    )
+
+
+def _search(query: str, limit: int) -> tuple[list[TMDbItem], Optional[str]]:
     hdrs = _headers()
     if not hdrs:
-        return []
+        return [], MISSING_KEY_ERROR
 
     items: list[TMDbItem] = []
     try:
         for kind, endpoint in (("movie", "search/movie"), ("tv", "search/tv")):
-            r = requests.get(
+            r = _session.get(
                 f"{TMDB_BASE}/{endpoint}",
                 params={"query": query, "language": "en-US"},
                 headers=hdrs,
                 timeout=10,
             )
             if r.status_code == 401:
-                _tmdb_last_error = "Invalid API key"
-                return []
+                return [], "Invalid API key"
             r.raise_for_status()
             for d in r.json().get("results", []) or []:
-                title = d.get("title") if kind == "movie" else d.get("name")
-                if not title:
-                    continue
-                year_field = (
-                    d.get("release_date") if kind == "movie" else d.get("first_air_date")
-                )
-                year = _extract_year(year_field)
-                popularity = float(d.get("popularity") or 0)
-                rating = float(d.get("vote_average") or 0)
-                overview = d.get("overview")
-                poster = _poster_url(d.get("poster_path"))
-                items.append(
-                    TMDbItem(
-                        id=int(d["id"]),
-                        title=title,
-                        year=year,
-                        kind=kind,
-                        poster=poster,
-                        popularity=popularity,
-                        rating=rating,
-                        overview=overview,
-                    )
-                )
-        _tmdb_last_error = None
+                item = _item_from_json(d, kind)
+                if item:
+                    items.append(item)
+        err = None
     except Exception as e:
-        _tmdb_last_error = f"search error: {e}"
+        err = f"search error: {e}"
         logging.error("TMDb search error: %s", e)
 
     items.sort(key=lambda x: x.popularity, reverse=True)
-    return items[:limit]
+    return items[:limit], err
 
 
-def get_seasons(tv_id: int) -> list[TMDbSeason]:
-    global _tmdb_last_error
+def search(query: str, limit: int = 10) -> tuple[list[TMDbItem], Optional[str]]:
+    """Return (results, error); error is None when TMDb answered normally."""
+    query = " ".join(query.split())
+    key = ("search", query.casefold(), limit)
+    results, err = _cached(key, lambda: _search(query, limit))
+    return list(results), err
+
+
+def _get_json(path: str) -> tuple[Optional[dict], Optional[str]]:
+    """GET a TMDb detail endpoint; /tv/{id} is shared by details and seasons."""
     hdrs = _headers()
     if not hdrs:
-        return []
+        return None, MISSING_KEY_ERROR
 
     try:
-        r = requests.get(
-            f"{TMDB_BASE}/tv/{tv_id}",
+        r = _session.get(
+            f"{TMDB_BASE}/{path}",
             params={"language": "en-US"},
             headers=hdrs,
             timeout=10,
         )
         if r.status_code == 401:
-            _tmdb_last_error = "Invalid API key"
-            return []
+            return None, "Invalid API key"
         r.raise_for_status()
-        seasons = r.json().get("seasons", []) or []
-        result = [
-            TMDbSeason(season_number=s["season_number"])
-            for s in seasons
-            if isinstance(s.get("season_number"), int) and s["season_number"] > 0
-        ]
-        _tmdb_last_error = None
-        return sorted(result, key=lambda s: s.season_number)
+        return r.json(), None
     except Exception as e:
-        _tmdb_last_error = f"seasons error: {e}"
-        logging.error("TMDb seasons error: %s", e)
+        logging.error("TMDb %s error: %s", path, e)
+        return None, f"{path} error: {e}"
+
+
+def get_details(kind: str, item_id: int) -> Optional[TMDbItem]:
+    if kind not in ("movie", "tv"):
+        return None
+    path = f"{kind}/{item_id}"
+    data, _ = _cached(("get", path), lambda: _get_json(path))
+    return _item_from_json(data, kind) if data else None
+
+
+def get_seasons(tv_id: int) -> list[TMDbSeason]:
+    path = f"tv/{tv_id}"
+    data, _ = _cached(("get", path), lambda: _get_json(path))
+    if not data:
         return []
+    seasons = data.get("seasons", []) or []
+    result = [
+        TMDbSeason(season_number=s["season_number"])
+        for s in seasons
+        if isinstance(s.get("season_number"), int) and s["season_number"] > 0
+    ]
+    return sorted(result, key=lambda s: s.season_number)
@@ -0,0 +1,33 @@
+"""Recursive directory walking built on os.scandir."""
+
+import logging
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+
+def file_ext(name: str) -> str:
+    """Lowercased extension with its dot (".mkv"), or "" — like Path.suffix.lower()."""
+    dot = name.rfind(".")
+    return name[dot:].lower() if dot > 0 else ""
+
+
+def iter_files(root: str | Path) -> Iterator[os.DirEntry]:
+    """Yield a DirEntry for every file under root.
+
+    Uses the d_type readdir already returned, so unlike Path.rglob plus
+    is_file() no per-entry stat is issued. Symlinked directories are not
+    followed.
+    """
+    stack = [os.fspath(root)]
+    while stack:
+        current = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError as e:
+            logging.debug("Cannot scan %s: %s", current, e)
@@ -1,6 +1,6 @@
 """Conversation state constants and helpers."""
 
-import re
+from dataclasses import dataclass
 from typing import Optional
 
 # State machine states
@@ -13,14 +13,24 @@ SERIES_TYPES = {"series", "anime"}
 MOVIE_TYPES = {"movie", "movies", "film", "films"}
 
 
+@dataclass(slots=True)
+class SelectedTitle:
+    """Title confirmed for the current flow (TMDb pick or recent destination)."""
+    id: int
+    kind: str  # "movie" or "tv"
+    title: str
+    year: Optional[int]
+
+
 def title_without_year(title: str, year: Optional[int]) -> str:
     if not title:
         return "Content"
     if year:
-        pattern = rf"\s*\({re.escape(str(year))}\)$"
+        # Plain suffix checks: no per-year regex is built or looked up per call.
+        suffix = f"({year})"
         cleaned = title.strip()
-        while re.search(pattern, cleaned):
-            cleaned = re.sub(pattern, "", cleaned).strip()
+        while cleaned.endswith(suffix):
+            cleaned = cleaned[: -len(suffix)].strip()
         return cleaned or "Content"
     return title.strip() or "Content"
 